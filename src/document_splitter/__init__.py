@@ -1,6 +1,16 @@
 """Document Splitter - Split documents into presentation slides using LLM."""
 
-from .splitter import split_document_into_sections
+from .splitter import (
+    split_document_into_sections,
+    asplit_document_into_sections,
+    asplit_batch,
+    split_documents_batch
+)
 
 __version__ = "1.0.0"
-__all__ = ["split_document_into_sections"]
+__all__ = [
+    "split_document_into_sections",
+    "asplit_document_into_sections",
+    "asplit_batch",
+    "split_documents_batch"
+]
@@ -1,6 +1,12 @@
 import asyncio
+import heapq
 from .config import MAX_PARALLEL_SPLITS, MAX_SPLIT_ROUNDS
-from .prompts import select_sections_to_combine, split_batch_parallel
+from .prompts import (
+    select_sections_to_combine,
+    aselect_sections_to_combine,
+    split_batch_parallel,
+    split_batch_prompt
+)
 from .fallbacks import fallback_split
 
 
@@ -9,20 +15,64 @@ def combine_sections(secs, target_count):
     Simple fallback combining - repeatedly merges the two smallest adjacent sections.
     Used when LLM-based combining fails.
     """
-    curr = list(secs)
-    while len(curr) > target_count:
-        # Find the pair of adjacent sections with the smallest combined size
-        best_idx = 0
-        best_size = float('inf')
-        for i in range(len(curr) - 1):
-            size = len(curr[i]) + len(curr[i + 1])
-            if size < best_size:
-                best_size = size
-                best_idx = i
-
-        # Merge them
-        combined = curr[best_idx] + "\n\n" + curr[best_idx + 1]
-        curr = curr[:best_idx] + [combined] + curr[best_idx + 2:]
+    n = len(secs)
+    if n <= target_count:
+        return list(secs)
+
+    # Min-heap over adjacent pairs plus a doubly-linked list of sections,
+    # so each merge is O(log n) instead of rescanning every pair and
+    # rebuilding the list. Generation counters invalidate stale heap entries.
+    text = list(secs)
+    size = [len(s) for s in text]
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n)) + [-1]
+    alive = [True] * n
+    gen = [0] * n
+
+    heap = [(size[i] + size[i + 1], i, 0) for i in range(n - 1)]
+    heapq.heapify(heap)
+
+    remaining = n
+    while remaining > target_count and heap:
+        _, i, g = heapq.heappop(heap)
+        j = nxt[i]
+        if not alive[i] or g != gen[i] or j == -1:
+            continue
+
+        # Merge the right neighbour into i and unlink it
+        text[i] = text[i] + "\n\n" + text[j]
+        size[i] += size[j] + 2
+        alive[j] = False
+        nxt[i] = nxt[j]
+        if nxt[j] != -1:
+            prev[nxt[j]] = i
+        gen[i] += 1
+        remaining -= 1
+
+        # Re-key the two pairs that now involve the merged section
+        if nxt[i] != -1:
+            heapq.heappush(heap, (size[i] + size[nxt[i]], i, gen[i]))
+        if prev[i] != -1:
+            p = prev[i]
+            gen[p] += 1
+            heapq.heappush(heap, (size[p] + size[i], p, gen[p]))
+
+    # The leftmost section always survives a merge, so walk from node 0
+    result = []
+    i = 0
+    while i != -1:
+        result.append(text[i])
+        i = nxt[i]
+
+    return result
+
+
+def _merge_selected_pairs(curr, pairs):
+    """Merge each selected (idx, idx+1) pair of adjacent sections."""
+    for idx in pairs:
+        if idx < len(curr) - 1:
+            combined = curr[idx] + "\n\n" + curr[idx + 1]
+            curr = curr[:idx] + [combined] + curr[idx + 2:]
 
     return curr
 
@@ -42,22 +92,43 @@ def combine_sections_llm(secs, target_count, client, model):
     if pairs is None:
         return combine_sections(secs, target_count)
 
-    # Merge the selected pairs
-    for idx in pairs:
-        if idx < len(curr) - 1:
-            combined = curr[idx] + "\n\n" + curr[idx + 1]
-            curr = curr[:idx] + [combined] + curr[idx + 2:]
+    return _merge_selected_pairs(curr, pairs)
 
-    return curr
+
+async def acombine_sections_llm(secs, target_count, client, model):
+    """Async variant of combine_sections_llm."""
+    curr = list(secs)
+
+    if len(curr) <= target_count:
+        return curr
+
+    pairs = await aselect_sections_to_combine(curr, target_count, client, model)
+    if pairs is None:
+        return combine_sections(secs, target_count)
+
+    return _merge_selected_pairs(curr, pairs)
 
 
 def split_sections_iteratively(sections, target_count, client, model, max_parallel=MAX_PARALLEL_SPLITS):
     """
     Iteratively split the largest sections until we reach the target count.
     Processes multiple sections in parallel for speed.
+
+    Thin sync wrapper - the event loop is created once here, not per round.
+    """
+    return asyncio.run(
+        split_sections_iteratively_async(sections, target_count, client, model, max_parallel)
+    )
+
+
+async def split_sections_iteratively_async(sections, target_count, client, model, max_parallel=MAX_PARALLEL_SPLITS):
+    """
+    Async core of split_sections_iteratively - all rounds share one event loop.
     """
     curr = list(sections)
-    cant_split = set()  # Track sections that couldn't be split
+    ids = list(range(len(curr)))  # Stable id per section - survives splices
+    next_id = len(curr)
+    cant_split = set()  # Ids of sections that couldn't be split
     retried = False
 
     for _ in range(MAX_SPLIT_ROUNDS):
@@ -67,20 +138,35 @@ def split_sections_iteratively(sections, target_count, client, model, max_parall
         needed = target_count - len(curr)
         # Find sections we haven't tried to split yet
         candidates = [
-            (i, section) for i, section in enumerate(curr)
-            if i not in cant_split
+            (pos, section) for pos, (section, sid) in enumerate(zip(curr, ids))
+            if sid not in cant_split
         ]
 
         if not candidates:
             break
 
-        # Split the largest sections first (they're most likely to have clear split points)
-        candidates.sort(key=lambda x: len(x[1]), reverse=True)
+        # Split the largest sections first (they're most likely to have clear
+        # split points) - a bounded partial sort, O(n log batch), instead of
+        # heapifying or sorting every candidate
         batch = min(needed, max_parallel, len(candidates))
-        to_split = candidates[:batch]
-
-        # Split multiple sections in parallel
-        results = asyncio.run(split_batch_parallel(to_split, client, model))
+        to_split = heapq.nlargest(batch, candidates, key=lambda x: len(x[1]))
+
+        # One batched call amortizes prompt overhead across the whole round;
+        # sections the batch parse couldn't recover (mangled sentinels, a
+        # truncated tail) get a dedicated per-section retry before being
+        # written off as unsplittable
+        if len(to_split) > 1:
+            results = await split_batch_prompt([s for _, s in to_split], client, model)
+            missing = [i for i, r in enumerate(results) if r is None]
+            if missing:
+                got = sum(1 for r in results if r and len(r) == 2)
+                retried_results = await split_batch_parallel(
+                    [to_split[i] for i in missing], client, model, needed - got
+                )
+                for i, r in zip(missing, retried_results):
+                    results[i] = r
+        else:
+            results = await split_batch_parallel(to_split, client, model, needed)
 
         # Process results in reverse order to handle index shifts
         idx_map = {idx: result for (idx, _), result in zip(to_split, results)}
@@ -91,14 +177,16 @@ def split_sections_iteratively(sections, target_count, client, model, max_parall
             r = idx_map[idx]
 
             if r and len(r) == 2:
-                # Successfully split into 2 parts
+                # Successfully split into 2 parts - splice in place and give
+                # both halves fresh ids (descending order keeps lower indices
+                # valid, and ids make position shifts irrelevant)
                 count += 1
-                curr = curr[:idx] + r + curr[idx + 1:]
-                # Adjust cant_split indices for the new section
-                cant_split = {i + (1 if i > idx else 0) for i in cant_split}
+                curr[idx:idx + 1] = r
+                ids[idx:idx + 1] = [next_id, next_id + 1]
+                next_id += 2
             else:
                 # Couldn't split this section
-                cant_split.add(idx)
+                cant_split.add(ids[idx])
 
         # If nothing split this round, try one more time with all sections
         if count == 0:
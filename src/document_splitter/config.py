@@ -9,8 +9,22 @@ CONTEXT_WINDOW_CHARS = 100
 CONTEXT_WORDS_BEFORE = 10
 CONTEXT_WORDS_AFTER = 10
 
+# Phase-2 prompt size: total chars of section previews before per-section
+# previews start shrinking (floor of 40 chars each)
+PHASE2_PREVIEW_BUDGET = 8000
+
+# Total token budget across the Phase-2 section previews (what the API
+# actually bills and what generation latency scales with); per-section
+# floor of 10 tokens
+PREVIEW_TOKEN_BUDGET = 2000
+
 # API timeouts (seconds)
 INITIAL_API_TIMEOUT_SECONDS = 60
 SPLIT_API_TIMEOUT_SECONDS = 30
 
 USE_STRUCTURED_OUTPUTS = True
+
+# Offline bulk splitting via the OpenAI Batch API (50% token discount,
+# much higher rate limits, up to 24h completion window)
+USE_BATCH_API = False
+BATCH_POLL_INTERVAL_SECONDS = 30
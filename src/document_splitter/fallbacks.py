@@ -1,6 +1,62 @@
 import re
+import bisect
+import collections
+import heapq
 from .config import CONTEXT_WINDOW_CHARS, CONTEXT_WORDS_BEFORE, CONTEXT_WORDS_AFTER
 
+# Compiled once at import - these run inside hot fallback loops.
+# A paragraph is a run of lines not separated by a blank line.
+_PARAGRAPH_RE = re.compile(r'[^\n]+(?:\n(?!\n)[^\n]+)*')
+_SENT_RE = re.compile(r'([.!?]+)\s+')
+
+
+class _AhoCorasick:
+    """
+    Minimal Aho-Corasick automaton for locating many fixed patterns in one
+    linear pass over a document, instead of one str.find scan per pattern.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._out = [[]]
+
+        for pid, pat in enumerate(patterns):
+            node = 0
+            for ch in pat:
+                child = self._goto[node].get(ch)
+                if child is None:
+                    self._goto.append({})
+                    self._out.append([])
+                    child = len(self._goto) - 1
+                    self._goto[node][ch] = child
+                node = child
+            self._out[node].append(pid)
+
+        # Fail links via BFS from the root
+        self._fail = [0] * len(self._goto)
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._out[child].extend(self._out[self._fail[child]])
+
+    def iter_matches(self, text):
+        """Yield (end_index, pattern_id) for every pattern occurrence."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pid in self._out[node]:
+                yield i + 1, pid
+
 
 def extract_valid_splits_from_failed_output(marked, orig):
     """
@@ -8,30 +64,57 @@ def extract_valid_splits_from_failed_output(marked, orig):
     Finds where the split markers are in the modified text, then locates those same
     positions in the original document using context matching.
     """
-    positions = [m.start() for m in re.finditer(r'<<SPLIT>>', marked)]
+    # Literal scan beats the regex engine for a fixed marker string
+    positions = []
+    marker_len = len('<<SPLIT>>')
+    pos = marked.find('<<SPLIT>>')
+    while pos != -1:
+        positions.append(pos)
+        pos = marked.find('<<SPLIT>>', pos + marker_len)
+
     if not positions:
         return None
 
-    pts = []
-    marker_len = len('<<SPLIT>>')
-
+    # Collect the context patterns around every marker first
+    needles = []
     for pos in positions:
-        # Get context around each marker
         before = marked[max(0, pos - CONTEXT_WINDOW_CHARS):pos]
         after = marked[pos + marker_len:pos + marker_len + CONTEXT_WINDOW_CHARS]
 
-        w_before = before.split()[-CONTEXT_WORDS_BEFORE:] if before.split() else []
-        w_after = after.split()[:CONTEXT_WORDS_AFTER] if after.split() else []
+        w_before = before.split()[-CONTEXT_WORDS_BEFORE:]
+        w_after = after.split()[:CONTEXT_WORDS_AFTER]
 
         if not w_before or not w_after:
             continue
 
-        # Try to find these context words in the original document
-        pattern1 = ' '.join(w_before)
-        pattern2 = ' '.join(w_after)
+        needles.append((' '.join(w_before), ' '.join(w_after)))
 
-        p1 = orig.find(pattern1)
-        p2 = orig.find(pattern2, p1 if p1 != -1 else 0)
+    if not needles:
+        return None
+
+    # Locate all patterns in one Aho-Corasick pass over the original
+    # document - two str.find scans per marker would be O(markers * doc)
+    pattern_ids = {}
+    for pattern1, pattern2 in needles:
+        for pat in (pattern1, pattern2):
+            if pat not in pattern_ids:
+                pattern_ids[pat] = len(pattern_ids)
+
+    patterns = list(pattern_ids)
+    lengths = [len(p) for p in patterns]
+    occurrences = [[] for _ in patterns]
+    for end, pid in _AhoCorasick(patterns).iter_matches(orig):
+        occurrences[pid].append(end - lengths[pid])
+
+    pts = []
+    for pattern1, pattern2 in needles:
+        occ1 = occurrences[pattern_ids[pattern1]]
+        occ2 = occurrences[pattern_ids[pattern2]]
+
+        p1 = occ1[0] if occ1 else -1
+        # First occurrence of the after-context at or past the before-context
+        k = bisect.bisect_left(occ2, p1 if p1 != -1 else 0)
+        p2 = occ2[k] if k < len(occ2) else -1
 
         # If we found both patterns, the split point is between them
         if p1 != -1 and p2 != -1 and p2 > p1:
@@ -68,24 +151,12 @@ def fallback_split(text, num_sections, combine_fn):
     Non-LLM fallback that splits on paragraph boundaries.
     If that gives wrong count, combines or splits sections mechanically.
     """
-    # Split on paragraph breaks
-    parts = re.split(r'(\n\n+)', text)
-
-    secs = []
-    curr = ''
-
-    for p in parts:
-        if p.strip():
-            if curr:
-                secs.append(curr)
-            curr = p
-        else:
-            curr += p
-
-    if curr:
-        secs.append(curr)
-
-    secs = [s.strip() for s in secs if s.strip()]
+    # Pull paragraph bodies straight out of the text in one regex pass -
+    # no Python-level stitching of content and delimiter parts
+    secs = [
+        s for s in (m.group(0).strip() for m in _PARAGRAPH_RE.finditer(text))
+        if s
+    ]
 
     if not secs:
         return [text]
@@ -96,42 +167,80 @@ def fallback_split(text, num_sections, combine_fn):
     elif len(secs) > num_sections:
         return combine_fn(secs, num_sections)
     else:
-        # Need more sections - split the longest ones
-        while len(secs) < num_sections:
-            longest_idx = max(range(len(secs)), key=lambda i: len(secs[i]))
-            longest = secs[longest_idx]
-
-            # Try splitting at sentence boundary first
-            sent = r'([.!?]+)\s+'
-            matches = list(re.finditer(sent, longest))
-
-            if len(matches) > 0:
-                mid = len(matches) // 2
-                pos = matches[mid].end()
+        # Need more sections - split the longest ones. Sections live in a
+        # linked list with a max-heap over sizes, so picking the next longest
+        # is a heap pop instead of rescanning every section per split.
+        texts = list(secs)
+        nxt = list(range(1, len(texts))) + [-1]
+        count = len(texts)
+        heap = [(-len(s), i) for i, s in enumerate(texts)]
+        heapq.heapify(heap)
+
+        while count < num_sections and heap:
+            neg_size, sid = heapq.heappop(heap)
+            longest = texts[sid]
+            if -neg_size != len(longest):
+                # Stale entry - this section was already split
+                continue
+
+            # Try splitting at the sentence boundary nearest the midpoint -
+            # two C-level scans per terminator instead of materializing a
+            # Match object for every sentence in the section
+            mid_char = len(longest) // 2
+            best = -1
+            for delim in ('. ', '! ', '? '):
+                for cand in (longest.rfind(delim, 0, mid_char),
+                             longest.find(delim, mid_char)):
+                    if cand != -1 and (best == -1 or abs(cand - mid_char) < abs(best - mid_char)):
+                        best = cand
+
+            if best != -1:
+                pos = best + 2  # Step past the terminator and the space
                 p1 = longest[:pos].strip()
                 p2 = longest[pos:].strip()
             else:
-                # No sentences, try line breaks
-                lines = longest.split('\n')
-                if len(lines) > 1:
-                    mid = len(lines) // 2
-                    p1 = '\n'.join(lines[:mid]).strip()
-                    p2 = '\n'.join(lines[mid:]).strip()
+                # Unusual punctuation/whitespace runs - fall back to the regex
+                matches = list(_SENT_RE.finditer(longest))
+                if len(matches) > 0:
+                    mid = len(matches) // 2
+                    pos = matches[mid].end()
+                    p1 = longest[:pos].strip()
+                    p2 = longest[pos:].strip()
                 else:
-                    # Last resort: split on nearest space to midpoint
-                    mid = len(longest) // 2
-                    sp = longest.rfind(' ', 0, mid)
-                    if sp == -1:
-                        sp = longest.find(' ', mid)
-                    if sp == -1:
-                        sp = mid
-
-                    p1 = longest[:sp].strip()
-                    p2 = longest[sp:].strip()
+                    # No sentences, try line breaks
+                    lines = longest.split('\n')
+                    if len(lines) > 1:
+                        mid = len(lines) // 2
+                        p1 = '\n'.join(lines[:mid]).strip()
+                        p2 = '\n'.join(lines[mid:]).strip()
+                    else:
+                        # Last resort: split on nearest space to midpoint
+                        sp = longest.rfind(' ', 0, mid_char)
+                        if sp == -1:
+                            sp = longest.find(' ', mid_char)
+                        if sp == -1:
+                            sp = mid_char
+
+                        p1 = longest[:sp].strip()
+                        p2 = longest[sp:].strip()
 
             if p1 and p2:
-                secs = secs[:longest_idx] + [p1, p2] + secs[longest_idx + 1:]
+                # Replace the node with p1 and link p2 in right after it
+                texts[sid] = p1
+                texts.append(p2)
+                nxt.append(nxt[sid])
+                nxt[sid] = len(texts) - 1
+                heapq.heappush(heap, (-len(p1), sid))
+                heapq.heappush(heap, (-len(p2), len(texts) - 1))
+                count += 1
             else:
                 break
 
+        # Walk the linked list to restore document order
+        secs = []
+        i = 0
+        while i != -1:
+            secs.append(texts[i])
+            i = nxt[i]
+
         return secs[:num_sections]
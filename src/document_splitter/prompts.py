@@ -1,27 +1,341 @@
 import re
 import asyncio
+import collections
+import functools
+import hashlib
+import heapq
 import logging
+import weakref
 import openai
 from typing import List
 from pydantic import BaseModel, Field, field_validator, conint
 from .config import (
     INITIAL_API_TIMEOUT_SECONDS,
     SPLIT_API_TIMEOUT_SECONDS,
-    MIN_SECTION_SIZE_CHARS
+    MIN_SECTION_SIZE_CHARS,
+    MAX_PARALLEL_SPLITS,
+    PHASE2_PREVIEW_BUDGET,
+    PREVIEW_TOKEN_BUDGET
 )
 
+try:
+    import httpx
+except ImportError:
+    # openai ships its own default HTTP client configuration
+    httpx = None
+
+try:
+    import tiktoken
+except ImportError:
+    # Optional - previews fall back to a chars-per-token estimate
+    tiktoken = None
+
 logger = logging.getLogger(__name__)
 
+# One async client + concurrency gate per event loop: httpx connection pools
+# are bound to the loop they were created on, so they can't survive across
+# successive asyncio.run calls
+_async_state = weakref.WeakKeyDictionary()
 
-def get_all_semantic_boundaries(doc, client, model, attempt=0):
+
+# In-process LRU of LLM response text keyed by request content - retries and
+# repeated combine/split rounds can re-issue an identical temperature-0
+# prompt, and a hit skips the whole round trip. Concurrent identical async
+# requests are single-flighted through _llm_inflight to one API call.
+_LLM_CACHE_MAX_ENTRIES = 512
+_llm_cache = collections.OrderedDict()
+_llm_inflight = {}
+
+
+def _llm_cache_key(model, messages):
+    # Stream the message parts into the hash - serializing the whole request
+    # with json.dumps would build an escaped copy of the document first
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model.encode())
+    for msg in messages:
+        h.update(b'\x00')
+        h.update(msg['role'].encode())
+        h.update(b'\x00')
+        h.update(msg['content'].encode())
+    return h.digest()
+
+
+def _llm_cache_get(key):
+    text = _llm_cache.get(key)
+    if text is not None:
+        _llm_cache.move_to_end(key)
+    return text
+
+
+def _llm_cache_put(key, text):
+    _llm_cache[key] = text
+    _llm_cache.move_to_end(key)
+    while len(_llm_cache) > _LLM_CACHE_MAX_ENTRIES:
+        _llm_cache.popitem(last=False)
+
+
+def _get_async_client(api_key):
     """
-    Phase 1: Ask the LLM to identify ALL natural semantic boundaries.
-    This removes the counting constraint and lets the LLM focus on understanding semantics.
+    Return an (AsyncOpenAI, Semaphore) pair for the running event loop.
+    The client keeps connections alive across calls so parallel splits reuse
+    sockets instead of paying a TCP+TLS handshake per request; the semaphore
+    enforces MAX_PARALLEL_SPLITS at the request layer.
+    """
+    loop = asyncio.get_running_loop()
+    per_loop = _async_state.get(loop)
+    if per_loop is None:
+        per_loop = {}
+        _async_state[loop] = per_loop
+
+    entry = per_loop.get(api_key)
+    if entry is None:
+        if httpx is not None:
+            async_client = openai.AsyncOpenAI(
+                api_key=api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_keepalive_connections=MAX_PARALLEL_SPLITS,
+                        max_connections=MAX_PARALLEL_SPLITS * 2
+                    ),
+                    timeout=SPLIT_API_TIMEOUT_SECONDS
+                )
+            )
+        else:
+            async_client = openai.AsyncOpenAI(api_key=api_key)
+        entry = (async_client, asyncio.Semaphore(MAX_PARALLEL_SPLITS))
+        per_loop[api_key] = entry
+
+    return entry
+
+async def _achat_cached(client, model, messages, timeout, max_tokens=None):
+    """
+    One cached chat completion against the per-loop async client.
+    Shared by the async variants of the prompt functions; raises on API
+    failure so each caller can keep its own error message. max_tokens, when
+    set, caps generation for calls whose output size is known up front.
+    """
+    key = _llm_cache_key(model, messages)
+    text = _llm_cache_get(key)
+    if text is None:
+        kwargs = {}
+        if max_tokens is not None:
+            kwargs['max_tokens'] = max_tokens
+        async_client, sem = _get_async_client(getattr(client, 'api_key', None))
+        async with sem:
+            resp = await async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                timeout=timeout,
+                **kwargs
+            )
+        text = resp.choices[0].message.content.strip()
+        _llm_cache_put(key, text)
+    return text
 
-    The trick here is we're NOT asking for an exact count - just "find every reasonable
-    place to split." This is way easier for the LLM and much more reliable.
+
+async def _astream_chat_cached(client, model, messages, timeout, have_enough, max_tokens=None):
+    """
+    Stream a chat completion and stop generation early. After each delta the
+    complete portion of the buffer (everything before the last comma) is fed
+    to have_enough; once it returns True the stream is closed, so short
+    list-style responses don't pay for trailing tokens the parser would
+    ignore anyway. Cached like _achat_cached.
     """
-    prompt = f"""Identify ALL natural split points in this document where one complete discrete idea ends and another begins. Insert the marker <<SPLIT>> at each split point.
+    key = _llm_cache_key(model, messages)
+    text = _llm_cache_get(key)
+    if text is not None:
+        return text
+
+    kwargs = {}
+    if max_tokens is not None:
+        kwargs['max_tokens'] = max_tokens
+    async_client, sem = _get_async_client(getattr(client, 'api_key', None))
+    pieces = []
+    text = None
+    async with sem:
+        stream = await async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0,
+            timeout=timeout,
+            stream=True,
+            **kwargs
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                pieces.append(delta)
+                buf = ''.join(pieces)
+                complete, sep, _ = buf.rpartition(',')
+                if sep and have_enough(complete):
+                    # Drop the partial tail past the last separator - it may
+                    # be a number that was still being generated
+                    text = complete
+                    break
+        finally:
+            await stream.close()
+
+    if text is None:
+        text = ''.join(pieces).strip()
+    _llm_cache_put(key, text)
+    return text
+
+
+# Compiled once at import for the boundary-discovery pass. One alternation
+# tags each breakpoint with its kind in priority order, so a paragraph break
+# is never double-counted as two line breaks
+_BOUNDARY_RE = re.compile(r'(?P<para>\n\n)|(?P<sent>[.!?]\s+)|(?P<line>\n)')
+
+# For early termination of streamed number-list responses
+_INT_RE = re.compile(r'\d+')
+_PAIR_RE = re.compile(r'(\d+)\s*-\s*(\d+)')
+
+
+def _section_preview(sec, cap, start=0, end=None):
+    """
+    First `cap` visible chars of a section with newlines flattened.
+    Slices straight out of the section instead of materializing a full
+    stripped copy just to throw all but the first `cap` chars away.
+    start/end let callers preview a span of a larger document in place.
+    """
+    if end is None:
+        end = len(sec)
+    while start < end and sec[start].isspace():
+        start += 1
+    while end > start and sec[end - 1].isspace():
+        end -= 1
+
+    preview = sec[start:min(end, start + cap)].replace('\n', ' ')
+    if end - start > cap:
+        preview += "..."
+    return preview
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    """The tokenizer used for preview budgets, or None without tiktoken."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model('gpt-4o')
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def _truncate_to_tokens(text, max_tokens):
+    """
+    Trim text to at most max_tokens tokens. Prompt cost is per token, not
+    per character, so character caps alone under-trim token-dense content
+    like JSON or code. Falls back to a ~4 chars/token estimate when
+    tiktoken isn't installed.
+    """
+    enc = _get_encoding()
+    if enc is None:
+        return text[:max_tokens * 4]
+    tokens = enc.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
+
+
+def _whitespace_equal_ignoring_marker(marked, original, marker='<<SPLIT>>'):
+    """
+    Check that `marked` matches `original` once markers are removed and any
+    run of whitespace is treated as equivalent.
+
+    Equivalent to comparing ' '.join() normalizations of both strings, but
+    walks them with two cursors instead - no intermediate strings, no token
+    lists, so validating a large document costs O(1) extra memory.
+    """
+    marker_len = len(marker)
+    n, m = len(marked), len(original)
+
+    # Fast path: a verbatim copy with markers inserted is the common success
+    # case. The length guard makes the replace+compare a cheap C-level pass,
+    # so the per-character Python walk only runs when whitespace differs.
+    if n - marked.count(marker) * marker_len == m and marked.replace(marker, '') == original:
+        return True
+
+    i = j = 0
+    at_start = True
+
+    while True:
+        # Skip any run of whitespace/markers in marked, noting whether
+        # actual whitespace was seen (markers alone don't break a token)
+        ws_marked = False
+        while i < n:
+            if marked[i].isspace():
+                ws_marked = True
+                i += 1
+            elif marked.startswith(marker, i):
+                i += marker_len
+            else:
+                break
+
+        ws_orig = False
+        while j < m and original[j].isspace():
+            ws_orig = True
+            j += 1
+
+        if i >= n or j >= m:
+            # Equal only if both sides are exhausted
+            return i >= n and j >= m
+
+        # Token boundaries must line up (leading whitespace doesn't count)
+        if not at_start and ws_marked != ws_orig:
+            return False
+        at_start = False
+
+        if marked[i] != original[j]:
+            return False
+        i += 1
+        j += 1
+
+
+# Verification verdicts keyed by content hash - temperature-0 retries often
+# return the identical marked text, so each distinct (marked, original) pair
+# pays for the comparator walk once instead of once per attempt. blake2b in C
+# is far cheaper than re-walking a large document in Python bytecode.
+_VERIFY_CACHE_MAX_ENTRIES = 64
+_verify_cache = collections.OrderedDict()
+
+
+def _verified_equal_ignoring_marker(marked, original):
+    key = (
+        hashlib.blake2b(marked.encode(), digest_size=16).digest(),
+        hashlib.blake2b(original.encode(), digest_size=16).digest()
+    )
+    verdict = _verify_cache.get(key)
+    if verdict is None:
+        verdict = _whitespace_equal_ignoring_marker(marked, original)
+        _verify_cache[key] = verdict
+        while len(_verify_cache) > _VERIFY_CACHE_MAX_ENTRIES:
+            _verify_cache.popitem(last=False)
+    else:
+        _verify_cache.move_to_end(key)
+    return verdict
+
+
+# Static prompt text lives in module-level constants so every call sends a
+# byte-identical instruction prefix - OpenAI's automatic prompt caching only
+# kicks in when the leading tokens repeat exactly, so variable content
+# (documents, sections, retry hints) always goes after the static block.
+_PHASE1_SYSTEM = (
+    'You insert <<SPLIT>> markers into documents at ALL natural boundaries where discrete ideas end. '
+    'Split at clear endpoints: after paragraphs, after bullet lists, or after sentences (if the sentence completes a discrete idea). '
+    'Return the complete document with markers at EVERY reasonable split point. Never split mid-sentence or mid-bullet-list. '
+    'CRITICAL: Copy the document EXACTLY character-for-character. '
+    'Preserve ALL formatting: newlines, blank lines, spacing, indentation, bullet points. '
+    'Do NOT change, add, or remove any whitespace, line breaks, or formatting. '
+    'The ONLY thing you add is the <<SPLIT>> marker - nothing else changes.'
+)
+
+_PHASE1_INSTRUCTIONS = """Identify ALL natural split points in this document where one complete discrete idea ends and another begins. Insert the marker <<SPLIT>> at each split point.
 
 Use the marker: <<SPLIT>>
 
@@ -43,29 +357,47 @@ CRITICAL: Return the complete original document with markers inserted.
 - Preserve ALL newlines, blank lines, and spacing EXACTLY as they appear
 - Do NOT modify, paraphrase, or reformat any text
 - Do NOT change line breaks or remove blank lines
-- The ONLY addition is the <<SPLIT>> marker
+- The ONLY addition is the <<SPLIT>> marker"""
 
-Document:
+# Instructions and the document header pre-joined once at import - building
+# the user message is then a single concat with the document itself
+_PHASE1_HEAD = _PHASE1_INSTRUCTIONS + "\n\nDocument:\n\n"
 
-{doc}"""
 
-    sys_msg = (
-        'You insert <<SPLIT>> markers into documents at ALL natural boundaries where discrete ideas end. '
-        'Split at clear endpoints: after paragraphs, after bullet lists, or after sentences (if the sentence completes a discrete idea). '
-        'Return the complete document with markers at EVERY reasonable split point. Never split mid-sentence or mid-bullet-list. '
-        'CRITICAL: Copy the document EXACTLY character-for-character. '
-        'Preserve ALL formatting: newlines, blank lines, spacing, indentation, bullet points. '
-        'Do NOT change, add, or remove any whitespace, line breaks, or formatting. '
-        'The ONLY thing you add is the <<SPLIT>> marker - nothing else changes.'
-    )
+def build_phase1_messages(doc, attempt=0):
+    """
+    Build the chat messages for the Phase-1 boundary-marking request.
+    Shared by the live path and the Batch API path. The retry hint goes in
+    a trailing user message so retries keep the cacheable prefix intact.
+    """
+    messages = [
+        {"role": "system", "content": _PHASE1_SYSTEM},
+        {"role": "user", "content": _PHASE1_HEAD + doc}
+    ]
 
     if attempt > 0:
-        sys_msg += f" Retry {attempt + 1}: Return the exact original text with only <<SPLIT>> markers added."
+        messages.append({
+            "role": "user",
+            "content": f"Retry {attempt + 1}: Return the exact original text with only <<SPLIT>> markers added."
+        })
+
+    return messages
 
-    messages = [
-        {"role": "system", "content": sys_msg},
-        {"role": "user", "content": prompt}
-    ]
+
+def get_all_semantic_boundaries(doc, client, model, attempt=0):
+    """
+    Phase 1: Ask the LLM to identify ALL natural semantic boundaries.
+    This removes the counting constraint and lets the LLM focus on understanding semantics.
+
+    The trick here is we're NOT asking for an exact count - just "find every reasonable
+    place to split." This is way easier for the LLM and much more reliable.
+    """
+    messages = build_phase1_messages(doc, attempt)
+
+    key = _llm_cache_key(model, messages)
+    cached = _llm_cache_get(key)
+    if cached is not None:
+        return cached
 
     try:
         resp = client.chat.completions.create(
@@ -74,172 +406,355 @@ Document:
             temperature=0,
             timeout=INITIAL_API_TIMEOUT_SECONDS
         )
-        return resp.choices[0].message.content.strip()
+        text = resp.choices[0].message.content.strip()
+        _llm_cache_put(key, text)
+        return text
     except Exception as e:
         logger.warning(f'API call failed (attempt {attempt + 1}): {e}')
         return None
 
 
-def select_n_boundaries(marked_doc, original_doc, target_slides, client, model):
+async def aget_all_semantic_boundaries(doc, client, model, attempt=0):
     """
-    Phase 2: Use LLM to intelligently select exactly N-1 boundaries from all candidates.
+    Async variant of get_all_semantic_boundaries - same prompt and cache,
+    but awaitable so callers can gather Phase 1 across documents.
+    """
+    messages = build_phase1_messages(doc, attempt)
 
-    The key insight: asking LLM to both find boundaries AND count to exactly N is hard.
-    But asking it to pick N items from a list? Much easier and more reliable.
+    try:
+        return await _achat_cached(client, model, messages, INITIAL_API_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f'API call failed (attempt {attempt + 1}): {e}')
+        return None
+
+
+_FUSED_SYSTEM = (
+    'You insert <<SPLIT>> markers into documents at ALL natural boundaries where discrete ideas end, '
+    'then select which markers to keep. '
+    'CRITICAL: Copy the document EXACTLY character-for-character - preserve all formatting, '
+    'newlines, and spacing. The ONLY additions are the <<SPLIT>> markers and the final SELECTED line.'
+)
+
+_FUSED_INSTRUCTIONS = """Do both steps in one response:
+
+Step 1 - Insert the marker <<SPLIT>> at EVERY natural split point in this document where one complete discrete idea ends and another begins. Never place a marker mid-sentence or mid-bullet-list. Copy the text EXACTLY character-by-character; the only addition is the <<SPLIT>> marker.
+
+Step 2 - Number the markers you inserted 0, 1, 2, ... in order of appearance. On one final line, after the document, write which markers to KEEP so the document is divided into the best sections:
+
+SELECTED: 0, 3, 5
+
+Pick the markers that create the most semantically coherent, roughly balanced sections."""
+
+
+async def aget_fused_boundaries(doc, target_slides, client, model):
     """
-    # First validate the LLM didn't modify content in Phase 1
-    no_markers = marked_doc.replace('<<SPLIT>>', '')
-    orig_normalized = ' '.join(original_doc.split())
-    returned_normalized = ' '.join(no_markers.split())
+    Fused Phase 1 + Phase 2: one call returns the fully marked document plus
+    the chosen boundary numbers on a trailing SELECTED line, saving a full
+    LLM round trip per document. Returns the final list of non-empty
+    sections, or None so the caller can fall back to the two-phase flow.
+    """
+    needed = target_slides - 1
 
-    if orig_normalized != returned_normalized:
-        logger.warning("Content was modified in Phase 1")
+    messages = [
+        {"role": "system", "content": _FUSED_SYSTEM},
+        {
+            "role": "user",
+            "content": f"{_FUSED_INSTRUCTIONS}\n\nKeep exactly {needed} markers.\n\nDocument:\n\n{doc}"
+        }
+    ]
+
+    try:
+        text = await _achat_cached(client, model, messages, INITIAL_API_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f'Fused split call failed: {e}')
         return None
 
-    # Split into sections based on ALL the boundaries we found
-    # Don't strip - we need to preserve exact spacing
-    sections = re.split(r'<<SPLIT>>', marked_doc)
+    marked, sep, last = text.rpartition('\n')
+    if not sep or not last.strip().upper().startswith('SELECTED:'):
+        logger.warning('Fused split response missing SELECTED line')
+        return None
+
+    marked = marked.strip()
+    selection = last.strip()[len('SELECTED:'):]
+
+    if not _verified_equal_ignoring_marker(marked, doc):
+        logger.warning("Content was modified in fused split")
+        return None
+
+    marker_len = len('<<SPLIT>>')
+    marker_positions = []
+    pos = marked.find('<<SPLIT>>')
+    while pos != -1:
+        marker_positions.append(pos)
+        pos = marked.find('<<SPLIT>>', pos + marker_len)
+
+    if not marker_positions:
+        logger.warning("No boundaries found in fused split")
+        return None
+
+    # Fewer markers than needed - use them all, the caller adjusts the count
+    if len(marker_positions) <= needed:
+        return [s for s in marked.split('<<SPLIT>>') if s]
+
+    return apply_boundary_selection(selection, marked, marker_positions, target_slides)
+
+
+_PHASE2_SYSTEM = (
+    'You select the requested number of boundaries from a list to create the '
+    'best document sections. Return only comma-separated numbers.'
+)
+
+_PHASE2_INSTRUCTIONS = """Your task: Pick exactly the requested number of boundaries to keep. These should be the boundaries that:
+1. Create the most semantically coherent sections
+2. Separate the most important topic changes
+3. Result in roughly balanced section sizes (but prioritize semantic coherence)
+
+A boundary exists between each pair of adjacent sections. For example:
+- Boundary 0 is between Section 0 and Section 1
+- Boundary 1 is between Section 1 and Section 2
+- etc."""
+
+
+def prepare_boundary_selection(marked_doc, original_doc, target_slides):
+    """
+    Front half of Phase 2: validate the Phase-1 output and, when there are
+    more boundaries than needed, build the selection request.
+
+    Returns (result, messages, marker_positions):
+    - (marked_doc, None, None) when the marked doc can be used as-is
+    - (None, None, None) on validation failure
+    - (None, messages, marker_positions) when the LLM must pick boundaries
+    """
+    # First validate the LLM didn't modify content in Phase 1
+    if not _verified_equal_ignoring_marker(marked_doc, original_doc):
+        logger.warning("Content was modified in Phase 1")
+        return None, None, None
 
-    num_boundaries = len(sections) - 1  # N sections = N-1 boundaries
+    # Record marker positions instead of splitting - sections stay as spans
+    # into marked_doc, so the document isn't duplicated in memory
+    marker_len = len('<<SPLIT>>')
+    marker_positions = []
+    pos = marked_doc.find('<<SPLIT>>')
+    while pos != -1:
+        marker_positions.append(pos)
+        pos = marked_doc.find('<<SPLIT>>', pos + marker_len)
+
+    num_boundaries = len(marker_positions)  # N sections = N-1 boundaries
 
     if num_boundaries == 0:
         logger.warning("No boundaries found")
-        return None
+        return None, None, None
 
     logger.info(f"Phase 1 found {num_boundaries} total boundaries, need {target_slides - 1}")
 
     # If we got exactly what we need, we're done
     if num_boundaries == target_slides - 1:
-        return marked_doc
+        return marked_doc, None, None
 
     # If we got fewer boundaries than needed, just use what we have
     # (caller will handle further splitting if needed)
     if num_boundaries < target_slides - 1:
-        return marked_doc
+        return marked_doc, None, None
 
     # Now the LLM needs to pick which boundaries to keep
     # Create a preview of each section for the LLM to evaluate
     needed = target_slides - 1
-
-    section_previews = []
-    for i, sec in enumerate(sections):
-        # Show first ~150 chars of each section (strip for preview only)
-        preview = sec.strip()[:150].replace('\n', ' ')
-        if len(sec.strip()) > 150:
-            preview += "..."
-        section_previews.append(f"Section {i}: {preview}")
+    num_sections = num_boundaries + 1
+
+    # Show the start of each section; shrink previews when there are so many
+    # sections that full-size ones would blow up the Phase-2 prompt
+    cap = 150
+    if num_sections * cap > PHASE2_PREVIEW_BUDGET:
+        cap = max(40, PHASE2_PREVIEW_BUDGET // num_sections)
+
+    section_starts = [0] + [p + marker_len for p in marker_positions]
+    section_ends = marker_positions + [len(marked_doc)]
+
+    # Character caps bound the slicing work; the token cap bounds what the
+    # prompt actually costs, since token-dense previews blow past a
+    # chars-per-token estimate
+    tok_cap = max(10, PREVIEW_TOKEN_BUDGET // num_sections)
+
+    section_previews = [
+        f"Section {i}: "
+        f"{_truncate_to_tokens(_section_preview(marked_doc, cap, section_starts[i], section_ends[i]), tok_cap)}"
+        for i in range(num_sections)
+    ]
 
     sections_text = "\n".join(section_previews)
 
-    prompt = f"""You previously identified {num_boundaries} potential split points in a document.
+    prompt = f"""{_PHASE2_INSTRUCTIONS}
+
+You previously identified {num_boundaries} potential split points in a document.
 Now you need to select exactly {needed} of these boundaries to create {target_slides} final sections.
 
-Here are the {len(sections)} sections that would be created if we kept ALL boundaries:
+Here are the {num_sections} sections that would be created if we kept ALL boundaries:
 
 {sections_text}
 
-Your task: Pick exactly {needed} boundaries to keep. These should be the boundaries that:
-1. Create the most semantically coherent sections
-2. Separate the most important topic changes
-3. Result in roughly balanced section sizes (but prioritize semantic coherence)
-
-A boundary exists between each pair of adjacent sections. For example:
-- Boundary 0 is between Section 0 and Section 1
-- Boundary 1 is between Section 1 and Section 2
-- etc.
-
 Return ONLY a comma-separated list of exactly {needed} boundary numbers (0 to {num_boundaries - 1}).
 For example: 0, 5, 12, 18, 25, 31, 38
 
 Your response (exactly {needed} numbers):"""
 
     messages = [
-        {
-            "role": "system",
-            "content": f"You select exactly {needed} boundaries from a list to create the best document sections. Return only comma-separated numbers."
-        },
+        {"role": "system", "content": _PHASE2_SYSTEM},
         {"role": "user", "content": prompt}
     ]
 
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0,
-            timeout=INITIAL_API_TIMEOUT_SECONDS
-        )
+    return None, messages, marker_positions
 
-        response_text = resp.choices[0].message.content.strip()
 
-        # Parse the boundary numbers from the LLM response
-        # Expected format: "0, 5, 12, 18, 25, 31, 38"
-        selected = []
-        for num_str in response_text.replace(' ', '').split(','):
-            try:
-                num = int(num_str)
-                # Only keep valid boundary indices
-                if 0 <= num < num_boundaries:
-                    selected.append(num)
-            except ValueError:
-                # Skip any non-numeric junk the LLM might have added
-                continue
+def apply_boundary_selection(response_text, marked_doc, marker_positions, target_slides):
+    """
+    Back half of Phase 2: parse the selection response and assemble the
+    final sections, splitting only at the selected boundaries. Returns the
+    list of non-empty sections, or None when the response can't be used.
+    """
+    marker_len = len('<<SPLIT>>')
+    num_boundaries = len(marker_positions)
+    needed = target_slides - 1
+
+    # Parse the boundary numbers from the LLM response
+    # Expected format: "0, 5, 12, 18, 25, 31, 38"
+    # One findall pulls every integer straight out of the text - no de-spaced
+    # intermediate copy and no per-token try/except for non-numeric junk
+    selected = [
+        num for num in map(int, _INT_RE.findall(response_text))
+        if num < num_boundaries
+    ]
+
+    # Dedupe and sort, then take exactly as many as we need
+    selected = sorted(set(selected))[:needed]
 
-        # Dedupe and sort, then take exactly as many as we need
-        selected = sorted(set(selected))[:needed]
+    # If the LLM didn't give us exactly the right count, something went wrong
+    if len(selected) != needed:
+        logger.warning(f"LLM returned {len(selected)} boundaries, expected {needed}")
+        return None
+
+    logger.info(f"Phase 2: LLM selected {len(selected)} boundaries: {selected}")
+
+    # Assemble the sections directly - splitting only at selected boundaries
+    # and stitching spans of marked_doc around each dropped marker, so the
+    # document is never rejoined just to be split on the markers again.
+    # frozenset gives O(1) membership vs scanning the selected list
+    kept = frozenset(selected)
+    sections = []
+    parts = []
+    seg_start = 0
+    for b, mpos in enumerate(marker_positions):
+        parts.append(marked_doc[seg_start:mpos])
+        if b in kept:
+            sections.append(''.join(parts))
+            parts = []
+        seg_start = mpos + marker_len
+    parts.append(marked_doc[seg_start:])
+    sections.append(''.join(parts))
+
+    # Only filter out completely empty strings
+    sections = [s for s in sections if s]
+
+    logger.info(f"Phase 2 complete: {len(sections)} sections in final output")
+
+    return sections
+
+
+def select_n_boundaries(marked_doc, original_doc, target_slides, client, model):
+    """
+    Phase 2: Use LLM to intelligently select exactly N-1 boundaries from all candidates.
+    Returns the final list of non-empty sections, or None on failure.
 
-        # If the LLM didn't give us exactly the right count, something went wrong
-        if len(selected) != needed:
-            logger.warning(f"LLM returned {len(selected)} boundaries, expected {needed}")
+    The key insight: asking LLM to both find boundaries AND count to exactly N is hard.
+    But asking it to pick N items from a list? Much easier and more reliable.
+    """
+    result, messages, marker_positions = prepare_boundary_selection(
+        marked_doc, original_doc, target_slides
+    )
+    if messages is None:
+        if result is None:
             return None
+        return [s for s in result.split('<<SPLIT>>') if s]
 
-        logger.info(f"Phase 2: LLM selected {len(selected)} boundaries: {selected}")
+    try:
+        key = _llm_cache_key(model, messages)
+        response_text = _llm_cache_get(key)
+        if response_text is None:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                timeout=INITIAL_API_TIMEOUT_SECONDS,
+                max_tokens=max(64, (target_slides - 1) * 6)
+            )
+
+            response_text = resp.choices[0].message.content.strip()
+            _llm_cache_put(key, response_text)
+    except Exception as e:
+        logger.warning(f"Phase 2 LLM call failed: {e}")
+        return None
 
-        # Rebuild document with only the selected boundaries
-        # Important: preserve exact spacing by only adding <<SPLIT>> back where selected
-        result_parts = []
-        for i, section in enumerate(sections):
-            result_parts.append(section)
-            # Add boundary marker if this boundary was selected
-            if i < len(sections) - 1 and i in selected:
-                result_parts.append('<<SPLIT>>')  # No extra whitespace
+    return apply_boundary_selection(response_text, marked_doc, marker_positions, target_slides)
 
-        result = ''.join(result_parts)
 
-        # Verify final count
-        final_count = result.count('<<SPLIT>>')
-        logger.info(f"Phase 2 complete: {final_count} boundaries in final output")
+async def aselect_n_boundaries(marked_doc, original_doc, target_slides, client, model):
+    """Async variant of select_n_boundaries."""
+    result, messages, marker_positions = prepare_boundary_selection(
+        marked_doc, original_doc, target_slides
+    )
+    if messages is None:
+        if result is None:
+            return None
+        return [s for s in result.split('<<SPLIT>>') if s]
+
+    # Stop the stream once the requested number of distinct valid boundary
+    # indices has fully arrived - the answer is ~needed numbers, so there is
+    # no point waiting out a preamble or trailing commentary
+    needed = target_slides - 1
+    num_boundaries = len(marker_positions)
 
-        return result
+    def have_enough(complete):
+        seen = {int(t) for t in _INT_RE.findall(complete)}
+        return len({v for v in seen if v < num_boundaries}) >= needed
 
+    try:
+        # The answer is just `needed` comma-separated numbers - cap output so
+        # a rambling response can't run to the model's default limit
+        response_text = await _astream_chat_cached(
+            client, model, messages, INITIAL_API_TIMEOUT_SECONDS, have_enough,
+            max_tokens=max(64, needed * 6)
+        )
     except Exception as e:
         logger.warning(f"Phase 2 LLM call failed: {e}")
         return None
 
+    return apply_boundary_selection(response_text, marked_doc, marker_positions, target_slides)
 
-def select_sections_to_combine(secs, target_count, client, model):
-    """
-    Ask the LLM which adjacent sections should be combined to reach target count.
-    Returns a list of indices representing the start of each pair to combine.
-    """
-    n_combines = len(secs) - target_count
-    if n_combines <= 0:
-        return []
 
+_COMBINE_SYSTEM = (
+    'You identify which adjacent document sections should be combined based '
+    'on semantic coherence.'
+)
+
+_COMBINE_INSTRUCTIONS = """Analyze which adjacent sections contain related ideas that should be combined together.
+
+You can only combine sections that are next to each other (adjacent). Section i can only combine with section i+1. Choose pairs that would create the most coherent combined sections.
+
+Return your answer as a comma-separated list of pairs in this format:
+0-1, 3-4, 7-8"""
+
+
+def _build_combine_messages(secs, target_count, n_combines):
+    """Build the chat messages asking which adjacent sections to combine."""
     formatted = []
     for i, sec in enumerate(secs):
         preview = sec[:200] + "..." if len(sec) > 200 else sec
-        formatted.append(f"Section {i}: {preview}")
+        formatted.append(f"Section {i}: {_truncate_to_tokens(preview, 50)}")
 
     sections_text = "\n\n".join(formatted)
 
-    prompt = f"""You have {len(secs)} sections and need to combine {n_combines} pairs of adjacent sections to get down to {target_count} sections.
-
-Analyze which adjacent sections contain related ideas that should be combined together.
+    prompt = f"""{_COMBINE_INSTRUCTIONS}
 
-You can only combine sections that are next to each other (adjacent). Section i can only combine with section i+1. Choose pairs that would create the most coherent combined sections. Return exactly {n_combines} pairs.
-
-Return your answer as a comma-separated list of pairs in this format:
-0-1, 3-4, 7-8
+You have {len(secs)} sections and need to combine {n_combines} pairs of adjacent sections to get down to {target_count} sections. Return exactly {n_combines} pairs.
 
 Sections:
 
@@ -247,46 +762,100 @@ Sections:
 
 Return only the pairs, nothing else:"""
 
-    msgs = [
-        {
-            'role': 'system',
-            'content': 'You identify which adjacent document sections should be combined based on semantic coherence.'
-        },
+    return [
+        {'role': 'system', 'content': _COMBINE_SYSTEM},
         {'role': 'user', 'content': prompt}
     ]
 
+
+def _parse_combine_pairs(text, num_secs, n_combines):
+    """Parse '0-1, 3-4' pair responses into left indices, newest-first."""
+    pairs = []
+    for left, right in _PAIR_RE.findall(text):
+        l = int(left)
+        if int(right) == l + 1 and l < num_secs - 1:
+            pairs.append(l)
+
+    pairs = sorted(set(pairs), reverse=True)
+    return pairs[:n_combines]
+
+
+def select_sections_to_combine(secs, target_count, client, model):
+    """
+    Ask the LLM which adjacent sections should be combined to reach target count.
+    Returns a list of indices representing the start of each pair to combine.
+    """
+    n_combines = len(secs) - target_count
+    if n_combines <= 0:
+        return []
+
+    msgs = _build_combine_messages(secs, target_count, n_combines)
+
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=msgs,
-            temperature=0,
-            timeout=INITIAL_API_TIMEOUT_SECONDS
-        )
+        key = _llm_cache_key(model, msgs)
+        text = _llm_cache_get(key)
+        if text is None:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=msgs,
+                temperature=0,
+                timeout=INITIAL_API_TIMEOUT_SECONDS,
+                max_tokens=max(64, n_combines * 8)
+            )
+
+            text = resp.choices[0].message.content.strip()
+            _llm_cache_put(key, text)
+
+        return _parse_combine_pairs(text, len(secs), n_combines)
 
-        text = resp.choices[0].message.content.strip()
+    except Exception as e:
+        logger.warning(f'Combining failed: {e}')
+        return None
 
-        pairs = []
-        for p in text.split(','):
-            p = p.strip()
-            if '-' in p:
-                try:
-                    left, right = p.split('-')
-                    l = int(left.strip())
-                    r = int(right.strip())
 
-                    if r == l + 1 and 0 <= l < len(secs) - 1:
-                        pairs.append(l)
-                except (ValueError, IndexError):
-                    continue
+async def aselect_sections_to_combine(secs, target_count, client, model):
+    """Async variant of select_sections_to_combine."""
+    n_combines = len(secs) - target_count
+    if n_combines <= 0:
+        return []
 
-        pairs = sorted(set(pairs), reverse=True)
-        return pairs[:n_combines]
+    msgs = _build_combine_messages(secs, target_count, n_combines)
+    num_secs = len(secs)
 
+    def have_enough(complete):
+        lefts = {
+            int(l) for l, r in _PAIR_RE.findall(complete)
+            if int(r) == int(l) + 1 and int(l) < num_secs - 1
+        }
+        return len(lefts) >= n_combines
+
+    try:
+        text = await _astream_chat_cached(
+            client, model, msgs, INITIAL_API_TIMEOUT_SECONDS, have_enough,
+            max_tokens=max(64, n_combines * 8)
+        )
+        return _parse_combine_pairs(text, num_secs, n_combines)
     except Exception as e:
         logger.warning(f'Combining failed: {e}')
         return None
 
 
+_SPLIT_SYSTEM = (
+    'You split sections at natural boundaries. Insert one <<SPLIT>> marker or '
+    'return unchanged. Critical: Copy the text EXACTLY character-for-character '
+    '- do not add spaces, remove spaces, or change any text. The only thing '
+    'you add is the <<SPLIT>> marker.'
+)
+
+_SPLIT_INSTRUCTIONS = """Split this section into exactly 2 parts by inserting one <<SPLIT>> marker.
+
+Find the natural break point between two ideas and insert <<SPLIT>> there.
+
+Never split in the middle of a sentence. Never split in the middle of a bullet list - if bullets refer to the same idea, keep them together. Only split after a bullet list if the following content is a different idea. If you cannot find a good split point, return the section unchanged (no marker). Return the complete section with one <<SPLIT>> marker or unchanged."""
+
+_SPLIT_HEAD = _SPLIT_INSTRUCTIONS + "\n\nSection:\n\n"
+
+
 async def split_section_async(sec, client, model):
     """
     Ask the LLM to split one section into two parts.
@@ -295,91 +864,350 @@ async def split_section_async(sec, client, model):
     if len(sec.strip()) < MIN_SECTION_SIZE_CHARS:
         return None
 
-    prompt = f"""Split this section into exactly 2 parts by inserting one <<SPLIT>> marker.
+    msgs = [
+        {'role': 'system', 'content': _SPLIT_SYSTEM},
+        {'role': 'user', 'content': _SPLIT_HEAD + sec}
+    ]
 
-Find the natural break point between two ideas and insert <<SPLIT>> there.
+    try:
+        key = _llm_cache_key(model, msgs)
+        txt = _llm_cache_get(key)
+
+        while txt is None:
+            inflight = _llm_inflight.get(key)
+            if inflight is not None:
+                # An identical request is already on the wire - share it
+                try:
+                    txt = await inflight
+                except asyncio.CancelledError:
+                    # Re-raise only if this task itself was cancelled. If the
+                    # cancellation came through the shared future it just
+                    # means the owner's round stopped wanting the result (the
+                    # early exit in split_batch_parallel) - that says nothing
+                    # about this caller, so loop and issue our own request
+                    # instead of inheriting the abort
+                    if asyncio.current_task().cancelling():
+                        raise
+                    txt = _llm_cache_get(key)
+            else:
+                fut = asyncio.get_running_loop().create_future()
+                _llm_inflight[key] = fut
+                try:
+                    async_client, sem = _get_async_client(getattr(client, 'api_key', None))
+                    async with sem:
+                        resp = await async_client.chat.completions.create(
+                            model=model,
+                            messages=msgs,
+                            temperature=0,
+                            timeout=SPLIT_API_TIMEOUT_SECONDS,
+                            # The full section comes back plus one marker -
+                            # ~3 chars/token leaves headroom over prose's ~4
+                            max_tokens=len(sec) // 3 + 16
+                        )
+                    txt = resp.choices[0].message.content.strip()
+                except BaseException as e:
+                    if not fut.done():
+                        fut.set_exception(e)
+                        fut.exception()  # Mark retrieved so no warning is logged
+                    raise
+                else:
+                    _llm_cache_put(key, txt)
+                    if not fut.done():
+                        fut.set_result(txt)
+                finally:
+                    _llm_inflight.pop(key, None)
+
+        return _validate_two_way_split(txt, sec)
 
-Never split in the middle of a sentence. Never split in the middle of a bullet list - if bullets refer to the same idea, keep them together. Only split after a bullet list if the following content is a different idea. If you cannot find a good split point, return the section unchanged (no marker). Return the complete section with one <<SPLIT>> marker or unchanged.
+    except Exception as e:
+        logger.warning(f'Split failed: {e}')
+        return None
 
-Section:
 
-{sec}"""
+def _validate_two_way_split(txt, sec):
+    """
+    Validate an LLM response that should be `sec` with one <<SPLIT>> marker
+    inserted. Returns the two stripped parts, or None.
+    """
+    marker_len = len('<<SPLIT>>')
+    marker_count = txt.count('<<SPLIT>>')
+
+    # Fast path: the common success case is the section returned verbatim
+    # with one marker inserted. The length guard plus an equal-length ==
+    # (a memcmp) avoids the whitespace-tolerant walk entirely.
+    if (marker_count == 1
+            and len(txt) - marker_len == len(sec)
+            and txt.replace('<<SPLIT>>', '', 1) == sec):
+        p = txt.index('<<SPLIT>>')
+        p1 = txt[:p].strip()
+        p2 = txt[p + marker_len:].strip()
+        if p1 and p2:
+            return [p1, p2]
+        return None
 
-    msgs = [
-        {
-            'role': 'system',
-            'content': 'You split sections at natural boundaries. Insert one <<SPLIT>> marker or return unchanged. Critical: Copy the text EXACTLY character-for-character - do not add spaces, remove spaces, or change any text. The only thing you add is the <<SPLIT>> marker.'
-        },
-        {'role': 'user', 'content': prompt}
+    if not _verified_equal_ignoring_marker(txt, sec):
+        return None
+
+    if marker_count:
+        parts = txt.split('<<SPLIT>>')
+        parts = [p.strip() for p in parts if p.strip()]
+
+        if len(parts) == 2:
+            return parts
+
+    return None
+
+
+async def split_batch_prompt(sections, client, model):
+    """
+    Split several sections with a single LLM call.
+    Each section is wrapped in unique sentinels and the model returns the
+    same wrappers with one <<SPLIT>> marker inserted per section (or the
+    section unchanged) - one request instead of one per section, and the
+    system-prompt prefill is paid once for the whole round.
+    Returns a list aligned with `sections` (2-part list or None per entry).
+    """
+    results = [None] * len(sections)
+    eligible = [
+        i for i, sec in enumerate(sections)
+        if len(sec.strip()) >= MIN_SECTION_SIZE_CHARS
     ]
+    if not eligible:
+        return results
 
-    try:
-        resp = await asyncio.to_thread(
-            client.chat.completions.create,
-            model=model,
-            messages=msgs,
-            temperature=0,
-            timeout=SPLIT_API_TIMEOUT_SECONDS
-        )
+    # Repeated boilerplate (headers, footers, recurring blocks) goes into
+    # the prompt once - duplicates get the representative's parsed result
+    rep_of = {}
+    dup_of = {}
+    for i in eligible:
+        rep = rep_of.setdefault(sections[i], i)
+        if rep != i:
+            dup_of[i] = rep
+    reps = [i for i in eligible if i not in dup_of]
 
-        txt = resp.choices[0].message.content.strip()
+    blocks = []
+    for i in reps:
+        blocks.append(f"===SEC_{i}_START===\n{sections[i]}\n===SEC_{i}_END===")
 
-        no_markers = txt.replace('<<SPLIT>>', '')
-        orig = ' '.join(sec.split())
-        returned = ' '.join(no_markers.split())
+    prompt = f"""Split each of the following sections into exactly 2 parts by inserting one <<SPLIT>> marker per section.
 
-        if orig != returned:
-            return None
+For each section, find the natural break point between two ideas and insert <<SPLIT>> there.
 
-        if '<<SPLIT>>' in txt:
-            parts = re.split(r'<<SPLIT>>', txt)
-            parts = [p.strip() for p in parts if p.strip()]
+Never split in the middle of a sentence. Never split in the middle of a bullet list - if bullets refer to the same idea, keep them together. Only split after a bullet list if the following content is a different idea. If you cannot find a good split point in a section, return that section unchanged (no marker).
 
-            if len(parts) == 2:
-                return parts
+Return EVERY section, in order, wrapped in its original ===SEC_N_START=== and ===SEC_N_END=== sentinels. Do not modify the sentinels.
 
-        return None
+Sections:
+
+{chr(10).join(blocks)}"""
 
+    msgs = [
+        {
+            'role': 'system',
+            'content': 'You split sections at natural boundaries. Insert one <<SPLIT>> marker per section or return it unchanged. Critical: Copy the text EXACTLY character-for-character - do not add spaces, remove spaces, or change any text. The only things you add are the <<SPLIT>> markers. Keep every ===SEC_N_START===/===SEC_N_END=== sentinel exactly as given.'
+        },
+        {'role': 'user', 'content': prompt}
+    ]
+
+    try:
+        key = _llm_cache_key(model, msgs)
+        text = _llm_cache_get(key)
+        if text is None:
+            async_client, sem = _get_async_client(getattr(client, 'api_key', None))
+            async with sem:
+                resp = await async_client.chat.completions.create(
+                    model=model,
+                    messages=msgs,
+                    temperature=0,
+                    timeout=SPLIT_API_TIMEOUT_SECONDS,
+                    # Every section echoed back with sentinels and one marker
+                    max_tokens=(
+                        sum(len(sections[i]) for i in reps) // 3
+                        + 16 * len(reps) + 64
+                    )
+                )
+            text = resp.choices[0].message.content.strip()
+            _llm_cache_put(key, text)
     except Exception as e:
-        logger.warning(f'Split failed: {e}')
-        return None
+        logger.warning(f'Batched split failed: {e}')
+        return results
+
+    for i in reps:
+        start_tag = f'===SEC_{i}_START==='
+        end_tag = f'===SEC_{i}_END==='
+        s = text.find(start_tag)
+        e = text.find(end_tag, s + len(start_tag)) if s != -1 else -1
+        if s == -1 or e == -1:
+            continue
+        chunk = text[s + len(start_tag):e].strip()
+        results[i] = _validate_two_way_split(chunk, sections[i])
+
+    for i, rep in dup_of.items():
+        if results[rep] is not None:
+            results[i] = list(results[rep])
+
+    return results
 
 
-async def split_batch_parallel(sections_to_split, client, model):
+async def split_batch_parallel(sections_to_split, client, model, needed=None):
     """
     Split multiple sections in parallel using async.
-    Returns a list of results (each is either a 2-part list or None).
+    Returns a list of results aligned with sections_to_split (each is either
+    a 2-part list or None). Results are consumed in completion order; the
+    per-loop semaphore inside split_section_async bounds how many requests
+    are actually in flight. If needed is given, stops waiting as soon as that
+    many splits have succeeded and cancels the still-running calls, so a
+    round doesn't pay the tail latency of requests it no longer needs.
     """
     tasks = [
-        split_section_async(sec, client, model)
+        asyncio.create_task(split_section_async(sec, client, model))
         for _, sec in sections_to_split
     ]
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    # Convert exceptions to None
-    results = [
-        result if not isinstance(result, Exception) else None
-        for result in results
-    ]
+    if needed is None or needed > len(tasks):
+        # Without a target every task must finish; the same loop below then
+        # simply drains to completion
+        needed = len(tasks)
+
+    results = [None] * len(tasks)
+    index_of = {task: i for i, task in enumerate(tasks)}
+    successes = 0
+    pending = set(tasks)
+
+    while pending and successes < needed:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            try:
+                result = task.result()
+            except Exception:
+                continue
+            results[index_of[task]] = result
+            if result and len(result) == 2:
+                successes += 1
+
+    if pending:
+        # Enough splits succeeded - cancel the stragglers and drain them
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
     return results
 
 
+def _merge_smallest_to_cap(sections, cap):
+    """
+    Repeatedly merge the smallest section into its right neighbour (or into
+    its left neighbour at the tail) until at most `cap` sections remain.
+    Min-heap over section sizes plus a doubly-linked list, so each merge is
+    O(log n) instead of rescanning every size and shifting the list.
+    Generation counters invalidate stale heap entries.
+    """
+    n = len(sections)
+    if n <= cap:
+        return list(sections)
+
+    text = list(sections)
+    size = [len(s) for s in text]
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n)) + [-1]
+    alive = [True] * n
+    gen = [0] * n
+
+    heap = [(size[i], i, 0) for i in range(n)]
+    heapq.heapify(heap)
+
+    remaining = n
+    while remaining > cap and heap:
+        _, i, g = heapq.heappop(heap)
+        if not alive[i] or g != gen[i]:
+            continue
+
+        j = nxt[i]
+        if j != -1:
+            # Absorb the right neighbour into i
+            text[i] = text[i] + text[j]
+            size[i] += size[j]
+            alive[j] = False
+            nxt[i] = nxt[j]
+            if nxt[j] != -1:
+                prev[nxt[j]] = i
+            gen[i] += 1
+            heapq.heappush(heap, (size[i], i, gen[i]))
+        else:
+            # Smallest section is the tail - fold it into its left neighbour
+            p = prev[i]
+            if p == -1:
+                break
+            text[p] = text[p] + text[i]
+            size[p] += size[i]
+            alive[i] = False
+            nxt[p] = -1
+            gen[p] += 1
+            heapq.heappush(heap, (size[p], p, gen[p]))
+
+        remaining -= 1
+
+    # The head section never gets absorbed leftward, so walk from node 0
+    result = []
+    i = 0
+    while i != -1:
+        result.append(text[i])
+        i = nxt[i]
+
+    return result
+
+
+@functools.lru_cache(maxsize=256)
+def _make_grouping_plan(max_index, target_slides):
+    """
+    Build the GroupingPlan model for a (max_index, target_slides) pair.
+    Defining the class inline triggered pydantic-core schema compilation on
+    every call; the lru_cache pays that cost once per distinct shape.
+    """
+    BoundedIndex = conint(ge=0, le=max_index)
+
+    class GroupingPlan(BaseModel):
+        split_after_indices: List[BoundedIndex] = Field(
+            min_length=target_slides - 1,
+            max_length=target_slides - 1
+        )
+
+        @field_validator('split_after_indices')
+        @classmethod
+        def validate_indices(cls, v):
+            if len(set(v)) != len(v):
+                raise ValueError(f'All {len(v)} indices must be unique, got only {len(set(v))} unique')
+            return sorted(v)
+
+    return GroupingPlan
+
+
 def single_pass_structured(doc, target_slides, client, model):
     """Single-pass split using structured outputs with mini-section grouping."""
     target_mini_sections = min(target_slides * 2, 100)
 
-    # Find natural breakpoints - paragraphs are cleanest, then sentences, then lines
-    paragraphs = list(re.finditer(r'\n\n', doc))
-    sentences = list(re.finditer(r'[.!?]\s+', doc))
-    lines = list(re.finditer(r'\n', doc))
+    # Find natural breakpoints - paragraphs are cleanest, then sentences, then
+    # lines. A single tagged scan replaces three full passes over the document.
+    # A sentence match's trailing whitespace can swallow a blank line, so a
+    # sent hit whose whitespace spans a paragraph break also counts as para -
+    # otherwise ".\n\n" breaks never reach the paragraph tier
+    paragraphs = []
+    sentences = []
+    lines = []
+    by_kind = {'para': paragraphs, 'sent': sentences, 'line': lines}
+    for m in _BOUNDARY_RE.finditer(doc):
+        kind = m.lastgroup
+        by_kind[kind].append(m.end())
+        if kind == 'sent' and '\n\n' in m.group():
+            paragraphs.append(m.end())
 
     # Use the finest granularity that gives us enough pieces to work with
     if len(paragraphs) >= target_mini_sections:
-        boundary_positions = [m.end() for m in paragraphs]
+        boundary_positions = paragraphs
     elif len(paragraphs) + len(sentences) >= target_mini_sections:
-        boundary_positions = [m.end() for m in paragraphs] + [m.end() for m in sentences]
+        boundary_positions = paragraphs + sentences
     else:
-        boundary_positions = [m.end() for m in paragraphs] + [m.end() for m in sentences] + [m.end() for m in lines]
+        boundary_positions = paragraphs + sentences + lines
 
     boundary_positions = sorted(set(p for p in boundary_positions if 0 < p < len(doc)))
 
@@ -403,62 +1231,40 @@ def single_pass_structured(doc, target_slides, client, model):
             mini_sections[-1] += section
 
     # Cap at 70 to keep the prompt manageable - repeatedly merge smallest sections
-    if len(mini_sections) > 70:
-        while len(mini_sections) > 70:
-            sizes = [len(s) for s in mini_sections]
-            min_idx = sizes.index(min(sizes))
-            if min_idx < len(mini_sections) - 1:
-                mini_sections[min_idx] = mini_sections[min_idx] + mini_sections[min_idx + 1]
-                mini_sections.pop(min_idx + 1)
-            else:
-                mini_sections[min_idx - 1] = mini_sections[min_idx - 1] + mini_sections[min_idx]
-                mini_sections.pop(min_idx)
+    mini_sections = _merge_smallest_to_cap(mini_sections, 70)
 
     # Merge tiny sections (< 50 chars) only if we have breathing room
     # If we're too close to target_slides, merging could leave us with too few
     if len(mini_sections) > target_slides + 10:
-        i = 0
-        while i < len(mini_sections):
-            if len(mini_sections[i]) < 50:
-                if i < len(mini_sections) - 1:
-                    mini_sections[i] = mini_sections[i] + mini_sections[i + 1]
-                    mini_sections.pop(i + 1)
-                elif i > 0:
-                    mini_sections[i - 1] = mini_sections[i - 1] + mini_sections[i]
-                    mini_sections.pop(i)
-                    i -= 1
-                else:
-                    i += 1
+        # Single forward pass - the last group keeps absorbing the next
+        # section until it reaches 50 chars. Replaces a while loop that
+        # popped from the middle of the list (an O(n) shift per merge)
+        merged = []
+        for sec in mini_sections:
+            if merged and len(merged[-1]) < 50:
+                merged[-1] += sec
             else:
-                i += 1
+                merged.append(sec)
+        # A still-tiny tail folds into its predecessor, which is already big
+        if len(merged) > 1 and len(merged[-1]) < 50:
+            tail = merged.pop()
+            merged[-1] += tail
+        mini_sections = merged
 
     if len(mini_sections) < target_slides:
         return None
 
-    # Build previews for the LLM to see what's in each mini-section
-    section_previews = []
-    for i, sec in enumerate(mini_sections):
-        preview = sec.strip()[:100].replace('\n', ' ')
-        if len(sec.strip()) > 100:
-            preview += "..."
-        section_previews.append(f"{i}. [{len(sec)} chars] {preview}")
+    # Build previews for the LLM to see what's in each mini-section -
+    # _section_preview slices instead of stripping each full section twice
+    section_previews = [
+        f"{i}. [{len(sec)} chars] {_truncate_to_tokens(_section_preview(sec, 100), 25)}"
+        for i, sec in enumerate(mini_sections)
+    ]
 
-    # Define Pydantic model for structured output validation
+    # Pydantic model for structured output validation - construction is
+    # memoized since it only depends on (max_index, target_slides)
     max_index = len(mini_sections) - 2
-    BoundedIndex = conint(ge=0, le=max_index)
-
-    class GroupingPlan(BaseModel):
-        split_after_indices: List[BoundedIndex] = Field(
-            min_length=target_slides - 1,
-            max_length=target_slides - 1
-        )
-
-        @field_validator('split_after_indices')
-        @classmethod
-        def validate_indices(cls, v):
-            if len(set(v)) != len(v):
-                raise ValueError(f'All {len(v)} indices must be unique, got only {len(set(v))} unique')
-            return sorted(v)
+    GroupingPlan = _make_grouping_plan(max_index, target_slides)
 
     # Give LLM a starting point - evenly spaced indices that it can adjust
     baseline = [int((i+1)*max_index/(target_slides-1)) for i in range(target_slides-1)]
@@ -486,7 +1292,9 @@ Mini-sections:
             ],
             response_format=GroupingPlan,
             temperature=0,
-            timeout=INITIAL_API_TIMEOUT_SECONDS
+            timeout=INITIAL_API_TIMEOUT_SECONDS,
+            # Output is one JSON array of target_slides - 1 indices
+            max_tokens=max(64, target_slides * 8)
         )
 
         indices = resp.choices[0].message.parsed.split_after_indices
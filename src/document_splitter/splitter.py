@@ -1,17 +1,27 @@
 import os
-import re
+import json
+import time
+import asyncio
 import logging
 from typing import List, Optional
 import openai
 from dotenv import load_dotenv
 from .config import MAX_RETRIES
 from . import config
-from .prompts import get_all_semantic_boundaries, select_n_boundaries, single_pass_structured
+from .prompts import (
+    aget_all_semantic_boundaries,
+    aget_fused_boundaries,
+    aselect_n_boundaries,
+    single_pass_structured,
+    build_phase1_messages,
+    prepare_boundary_selection,
+    apply_boundary_selection
+)
 from .fallbacks import extract_valid_splits_from_failed_output, fallback_split
 from .adjustments import (
     combine_sections,
-    combine_sections_llm,
-    split_sections_iteratively
+    acombine_sections_llm,
+    split_sections_iteratively_async
 )
 
 load_dotenv()
@@ -29,6 +39,25 @@ def split_document_into_sections(
     """
     Split a document into the target number of sections using LLM-based semantic splitting.
     Falls back to simpler methods if the LLM fails or modifies content.
+
+    Thin sync wrapper - the async core shares one event loop across every
+    LLM round instead of spinning one up per adjustment pass.
+    """
+    return asyncio.run(
+        asplit_document_into_sections(document, target_slides, api_key, model)
+    )
+
+
+async def asplit_document_into_sections(
+    document: str,
+    target_slides: int,
+    api_key: Optional[str] = None,
+    model: str = "gpt-4o"
+) -> List[str]:
+    """
+    Async core of split_document_into_sections. Await this directly from an
+    existing event loop to split several documents concurrently - each call
+    is I/O-bound on the LLM, so gathered calls overlap almost entirely.
     """
     if target_slides < 1 or target_slides > 50:
         raise ValueError('Need between 1-50 sections')
@@ -47,8 +76,46 @@ def split_document_into_sections(
     client = openai.OpenAI(api_key=api_key)
 
     # Get initial split from LLM
-    secs = _get_initial_sections(document, target_slides, client, model)
+    secs = await _aget_initial_sections(document, target_slides, client, model)
+
+    return await _aadjust_section_count(secs, target_slides, client, model)
+
+
+async def asplit_batch(
+    documents: List[str],
+    target_slides: int,
+    api_key: Optional[str] = None,
+    model: str = "gpt-4o",
+    max_concurrency: int = config.MAX_PARALLEL_SPLITS
+) -> List[List[str]]:
+    """
+    Split many documents concurrently on one event loop.
+    The semaphore caps how many documents are in flight at once so a large
+    batch doesn't trip API rate limits; within each document the per-loop
+    request semaphore still applies.
+    """
+    gate = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(doc):
+        async with gate:
+            return await asplit_document_into_sections(doc, target_slides, api_key, model)
 
+    return list(await asyncio.gather(*(run_one(doc) for doc in documents)))
+
+
+def _adjust_section_count(secs, target_slides, client, model):
+    """
+    Bring an initial section list to exactly target_slides sections.
+    Sync wrapper for the Batch API path.
+    """
+    return asyncio.run(_aadjust_section_count(secs, target_slides, client, model))
+
+
+async def _aadjust_section_count(secs, target_slides, client, model):
+    """
+    Bring an initial section list to exactly target_slides sections.
+    Shared by the live path and the Batch API path.
+    """
     if len(secs) == target_slides:
         logger.info(f"Got exactly {target_slides} sections on first try")
         return secs
@@ -57,7 +124,7 @@ def split_document_into_sections(
         logger.info(f'Got {len(secs)} sections, need to combine down to {target_slides}')
         temp = secs
         for _ in range(MAX_RETRIES):
-            result = combine_sections_llm(temp, target_slides, client, model)
+            result = await acombine_sections_llm(temp, target_slides, client, model)
 
             if len(result) == target_slides:
                 return result
@@ -72,16 +139,16 @@ def split_document_into_sections(
 
         # Somehow ended up with too few, need to split more
         if len(temp) < target_slides:
-            return split_sections_iteratively(temp, target_slides, client, model)
+            return await split_sections_iteratively_async(temp, target_slides, client, model)
 
         return temp
     else:
         # Too few sections - split the largest ones until we hit the target
         logger.info(f"Got {len(secs)} sections, need to split up to {target_slides}")
-        return split_sections_iteratively(secs, target_slides, client, model)
+        return await split_sections_iteratively_async(secs, target_slides, client, model)
 
 
-def _get_initial_sections(doc, target_slides, client, model):
+async def _aget_initial_sections(doc, target_slides, client, model):
     """
     Two-phase approach:
     Phase 1: Ask the LLM to identify ALL semantic boundaries (no counting constraint)
@@ -91,7 +158,11 @@ def _get_initial_sections(doc, target_slides, client, model):
     """
     if config.USE_STRUCTURED_OUTPUTS:
         for attempt in range(2):
-            result = single_pass_structured(doc, target_slides, client, model)
+            # The structured-output helper is sync (beta parse API), so it
+            # runs in a worker thread to keep the loop free for other docs
+            result = await asyncio.to_thread(
+                single_pass_structured, doc, target_slides, client, model
+            )
             if result and len(result) == target_slides:
                 logger.info(f"Structured output succeeded: {len(result)} sections (attempt {attempt+1})")
                 return result
@@ -101,10 +172,17 @@ def _get_initial_sections(doc, target_slides, client, model):
         logger.error("Structured output failed after 2 attempts")
         raise ValueError(f"Structured output failed after 2 attempts for N={target_slides}")
 
+    # Try fusing both phases into one call first - marking and selection in a
+    # single round trip halves the latency when the model cooperates
+    secs = await aget_fused_boundaries(doc, target_slides, client, model)
+    if secs is not None:
+        logger.info(f'Fused split successful - got {len(secs)} sections (target: {target_slides})')
+        return secs
+
     for attempt in range(MAX_RETRIES):
         # Phase 1: Get all semantic boundaries
         logger.info(f"Phase 1: Identifying all semantic boundaries (attempt {attempt + 1})")
-        marked = get_all_semantic_boundaries(doc, client, model, attempt)
+        marked = await aget_all_semantic_boundaries(doc, client, model, attempt)
 
         if marked is None:
             if attempt == MAX_RETRIES - 1:
@@ -114,7 +192,7 @@ def _get_initial_sections(doc, target_slides, client, model):
 
         # Phase 2: Select exactly target_slides - 1 boundaries using LLM
         logger.info(f"Phase 2: Asking LLM to select exactly {target_slides - 1} boundaries")
-        result = select_n_boundaries(marked, doc, target_slides, client, model)
+        result = await aselect_n_boundaries(marked, doc, target_slides, client, model)
 
         if result is None:
             # Phase 2 failed - but we have good boundaries from Phase 1, so use those
@@ -130,11 +208,150 @@ def _get_initial_sections(doc, target_slides, client, model):
                 return fallback_split(doc, target_slides, combine_sections)
             continue
 
-        # Split on the selected boundaries
-        secs = re.split(r'<<SPLIT>>', result)
-        secs = [s for s in secs if s]  # Only filter out completely empty strings
-
-        logger.info(f'Two-phase split successful - got exactly {len(secs)} sections (target: {target_slides})')
-        return secs
+        # Phase 2 already split at the selected boundaries
+        logger.info(f'Two-phase split successful - got exactly {len(result)} sections (target: {target_slides})')
+        return result
 
     return fallback_split(doc, target_slides, combine_sections)
+
+
+def split_documents_batch(
+    documents: List[str],
+    target_slides: int,
+    api_key: Optional[str] = None,
+    model: str = "gpt-4o"
+) -> List[List[str]]:
+    """
+    Split many documents in one offline run via the OpenAI Batch API.
+
+    Batched requests are billed at half price and get much higher rate limits
+    than the live endpoint, in exchange for waiting on a completion window -
+    the right trade for bulk jobs. Phase 1 for all documents goes up as one
+    JSONL batch, the Phase-2 boundary selections as a second one. Documents
+    the batches couldn't handle fall back to the live per-document path.
+    Requires config.USE_BATCH_API; otherwise each document is processed live.
+    """
+    if target_slides < 1 or target_slides > 50:
+        raise ValueError('Need between 1-50 sections')
+    if any(not doc or not doc.strip() for doc in documents):
+        raise ValueError('Document is empty')
+
+    if not config.USE_BATCH_API or target_slides == 1 or not documents:
+        return [
+            split_document_into_sections(doc, target_slides, api_key, model)
+            for doc in documents
+        ]
+
+    if api_key is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+
+    if not api_key:
+        raise ValueError('Missing OpenAI API key')
+
+    client = openai.OpenAI(api_key=api_key)
+
+    # Phase 1 for every document in one batch
+    phase1_requests = {
+        str(i): build_phase1_messages(doc) for i, doc in enumerate(documents)
+    }
+    phase1_responses = _run_chat_batch(client, model, phase1_requests)
+
+    # Phase 2: validate each marked document and collect the selection
+    # prompts that actually need an LLM call into a second batch
+    results: List[Optional[List[str]]] = [None] * len(documents)
+    phase2_requests = {}
+    phase2_state = {}
+
+    for i, doc in enumerate(documents):
+        marked = phase1_responses.get(str(i))
+        if marked is None:
+            continue
+
+        result, messages, marker_positions = prepare_boundary_selection(
+            marked.strip(), doc, target_slides
+        )
+        if messages is None:
+            if result is not None:
+                results[i] = _sections_from_marked(result)
+        else:
+            phase2_requests[str(i)] = messages
+            phase2_state[str(i)] = (marked.strip(), marker_positions)
+
+    if phase2_requests:
+        phase2_responses = _run_chat_batch(client, model, phase2_requests)
+        for cid, response_text in phase2_responses.items():
+            marked, marker_positions = phase2_state[cid]
+            result = apply_boundary_selection(
+                response_text.strip(), marked, marker_positions, target_slides
+            )
+            if result is not None:
+                results[int(cid)] = result
+
+    # Adjust counts and fill in anything the batches couldn't handle
+    final = []
+    for i, doc in enumerate(documents):
+        if results[i] is not None:
+            final.append(_adjust_section_count(results[i], target_slides, client, model))
+        else:
+            logger.info(f'Batch path failed for document {i}, using live path')
+            final.append(split_document_into_sections(doc, target_slides, api_key, model))
+
+    return final
+
+
+def _sections_from_marked(marked):
+    """Split a marker-annotated document into its non-empty sections."""
+    return [s for s in marked.split('<<SPLIT>>') if s]
+
+
+def _run_chat_batch(client, model, messages_by_id):
+    """
+    Submit one Batch API job for a set of chat requests and poll until it
+    finishes. Returns {custom_id: response_text} for the successful lines;
+    failed lines are simply absent.
+    """
+    lines = [
+        json.dumps({
+            'custom_id': cid,
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': {'model': model, 'messages': messages, 'temperature': 0}
+        })
+        for cid, messages in messages_by_id.items()
+    ]
+
+    try:
+        batch_file = client.files.create(
+            file=('batch_requests.jsonl', '\n'.join(lines).encode()),
+            purpose='batch'
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+
+        logger.info(f'Submitted batch {batch.id} with {len(lines)} requests')
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            time.sleep(config.BATCH_POLL_INTERVAL_SECONDS)
+            batch = client.batches.retrieve(batch.id)
+
+        if batch.status != 'completed' or not batch.output_file_id:
+            logger.warning(f'Batch {batch.id} finished with status {batch.status}')
+            return {}
+
+        raw = client.files.content(batch.output_file_id).text
+    except Exception as e:
+        logger.warning(f'Batch API call failed: {e}')
+        return {}
+
+    responses = {}
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        resp = entry.get('response')
+        if resp and resp.get('status_code') == 200:
+            responses[entry['custom_id']] = resp['body']['choices'][0]['message']['content']
+
+    return responses
@@ -10,6 +10,7 @@ import unittest
 from src.document_splitter import split_document_into_sections
 from src.document_splitter.adjustments import combine_sections
 from src.document_splitter.fallbacks import fallback_split
+from src.document_splitter.prompts import _whitespace_equal_ignoring_marker
 
 
 class TestBasicFunctionality(unittest.TestCase):
@@ -20,6 +21,18 @@ class TestBasicFunctionality(unittest.TestCase):
         result = combine_sections(sections, 3)
         self.assertEqual(len(result), 3)
 
+    def test_whitespace_equal_ignoring_marker(self):
+        # Markers and whitespace amounts are ignored, token boundaries are not
+        self.assertTrue(_whitespace_equal_ignoring_marker(
+            "First idea.<<SPLIT>>\n\nSecond idea.", "First idea.\n\nSecond idea."))
+        self.assertTrue(_whitespace_equal_ignoring_marker(
+            "  First   idea. Second.", "First idea.\nSecond."))
+        # Modified content must be rejected
+        self.assertFalse(_whitespace_equal_ignoring_marker(
+            "First idea.<<SPLIT>>Second thought.", "First idea.Second idea."))
+        self.assertFalse(_whitespace_equal_ignoring_marker(
+            "First idea. Extra.", "First idea."))
+
     def test_fallback_split(self):
         # Fallback should split on paragraph boundaries
         document = "Paragraph 1\n\nParagraph 2\n\nParagraph 3\n\nParagraph 4"
@@ -35,32 +48,40 @@ class TestIntegration(unittest.TestCase):
         doc_path = Path(__file__).parent.parent / "examples" / "sample_document.md"
         if doc_path.exists():
             cls.sample_doc = doc_path.read_text()
+            cls.original_normalized = " ".join(cls.sample_doc.split())
         else:
             cls.sample_doc = None
+        cls._splits = {}
 
     def setUp(self):
         if not self.sample_doc:
             self.skipTest("sample_document.md not found")
 
-    def test_split_12_sections(self):
-        sections = split_document_into_sections(self.sample_doc, 12)
-        self.assertEqual(len(sections), 12)
-
+    @classmethod
+    def _split(cls, target):
+        # One split per target per run, shared by any tests asserting on the
+        # same target. Cross-target sharing only happens on the two-phase
+        # flow (Phase 1 is target-invariant and response-cached); the default
+        # structured path builds a target-dependent prompt, so each distinct
+        # target still pays its own LLM call.
+        if target not in cls._splits:
+            cls._splits[target] = split_document_into_sections(cls.sample_doc, target)
+        return cls._splits[target]
+
+    def assert_content_preserved(self, sections):
         # Make sure no content was lost or changed
         combined = "\n\n".join(sections)
-        original_normalized = " ".join(self.sample_doc.split())
-        combined_normalized = " ".join(combined.split())
-        self.assertEqual(original_normalized, combined_normalized)
+        self.assertEqual(self.original_normalized, " ".join(combined.split()))
+
+    def test_split_12_sections(self):
+        sections = self._split(12)
+        self.assertEqual(len(sections), 12)
+        self.assert_content_preserved(sections)
 
     def test_split_37_sections(self):
-        sections = split_document_into_sections(self.sample_doc, 37)
+        sections = self._split(37)
         self.assertEqual(len(sections), 37)
-
-        # Make sure no content was lost or changed
-        combined = "\n\n".join(sections)
-        original_normalized = " ".join(self.sample_doc.split())
-        combined_normalized = " ".join(combined.split())
-        self.assertEqual(original_normalized, combined_normalized)
+        self.assert_content_preserved(sections)
 
 
 class TestEdgeCases(unittest.TestCase):